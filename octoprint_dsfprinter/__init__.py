@@ -1,15 +1,22 @@
 # coding=utf-8
 from __future__ import absolute_import
 
+import os
+import threading
+import time
+
 import octoprint.plugin
 
-from octoprint_dsfprinter import simple_serial, simple_printer
+from octoprint_dsfprinter import simple_serial, simple_printer, process_printer
 
 
 class DSFPrinterPlugin(
 	octoprint.plugin.SettingsPlugin,
 	octoprint.plugin.AssetPlugin,
-	octoprint.plugin.StartupPlugin):
+	octoprint.plugin.StartupPlugin,
+	octoprint.plugin.SimpleApiPlugin):
+
+	MAX_PROFILE_SECONDS = 300.0
 
 	# StartupPlugin mixin
 
@@ -17,6 +24,9 @@ class DSFPrinterPlugin(
 		super().__init__()
 		self.comm_instance = None
 		self.printer = None
+		self.serial = None
+		self._profile_lock = threading.Lock()
+		self._profile_thread = None
 
 	def on_after_startup(self):
 		self._logger.info("Loaded DSFPrinter Plugin")
@@ -52,6 +62,16 @@ class DSFPrinterPlugin(
 			"m115FormatString": "FIRMWARE_NAME:{firmware_name} PROTOCOL_VERSION:1.0",
 			"m114FormatString": "X:{x} Y:{y} Z:{z} E:{e[current]} Count: A:{a} B:{b} C:{c}",
 			"ambientTemperature": 21.3,
+			"outOfProcess": False,
+			"ringBufferSize": 65536,
+			"optimizeStream": False,
+			"optimizeInterval": 6.0,
+			"recordSessions": False,
+			"recordSessionsKeep": 3,
+			"serialLogLevel": "INFO",
+			"serialLogQueueSize": 10000,
+			"serialLogBatchSize": 256,
+			"serialLogCompress": False,
 			"errors": {
 				"checksum_mismatch": "Checksum mismatch",
 				"checksum_missing": "Missing checksum",
@@ -85,6 +105,83 @@ class DSFPrinterPlugin(
 			less=["less/dsfprinter.less"]
 		)
 
+	# SimpleApiPlugin mixin
+
+	def get_api_commands(self):
+		return dict(profile=[])
+
+	def on_api_command(self, command, data):
+		import flask
+		from octoprint.access.permissions import Permissions
+
+		if not Permissions.ADMIN.can():
+			flask.abort(403)
+
+		if command == "profile":
+			try:
+				seconds = float(data.get("seconds", 10.0))
+			except (TypeError, ValueError):
+				flask.abort(400, description="seconds must be a number")
+			if not seconds > 0:
+				flask.abort(400, description="seconds must be greater than 0")
+			seconds = min(seconds, self.MAX_PROFILE_SECONDS)
+			name = time.strftime("profile-%Y%m%d-%H%M%S.folded")
+			with self._profile_lock:
+				if self._profile_thread is not None and self._profile_thread.is_alive():
+					flask.abort(409, description="Profiler is already running")
+				self._profile_thread = threading.Thread(
+					target=self._profile, args=(seconds, name),
+					name="octoprint.plugins.dsfprinter.profile_thread", daemon=True)
+				self._profile_thread.start()
+			return flask.jsonify(file=name, seconds=seconds, url="plugin/dsfprinter/profiles/{}".format(name))
+
+	def on_api_get(self, request):
+		import flask
+		from octoprint.access.permissions import Permissions
+
+		if not Permissions.ADMIN.can():
+			flask.abort(403)
+
+		folder = self._get_profiles_folder()
+		profiles = [
+			dict(file=name, size=os.path.getsize(os.path.join(folder, name)), url="plugin/dsfprinter/profiles/{}".format(name))
+			for name in sorted(os.listdir(folder)) if name.endswith(".folded")]
+		running = self._profile_thread is not None and self._profile_thread.is_alive()
+		optimizer = self.serial.optimizer_counters if self.serial is not None else None
+		return flask.jsonify(profiles=profiles, running=running, optimizer=optimizer)
+
+	def _profile(self, seconds, name):
+		from .profiler import SamplingProfiler
+
+		self._logger.info("Profiling plugin threads for {}s".format(seconds))
+		profiler = SamplingProfiler()
+		profiler.run(seconds)
+		path = os.path.join(self._get_profiles_folder(), name)
+		profiler.write_collapsed(path)
+		self._logger.info("Wrote profile of {} samples to {}".format(profiler.samples, path))
+
+	def _get_profiles_folder(self):
+		folder = os.path.join(self.get_plugin_data_folder(), "profiles")
+		os.makedirs(folder, exist_ok=True)
+		return folder
+
+	# Server routes hook
+
+	def get_server_routes(self, server_routes, *args, **kwargs):
+		from octoprint.access.permissions import Permissions
+		from octoprint.server import app
+		from octoprint.server.util.flask import permission_validator
+		from octoprint.server.util.tornado import LargeResponseHandler, access_validation_factory, path_validation_factory
+		from octoprint.util import is_hidden_path
+
+		return [
+			(r"/profiles/(.*)", LargeResponseHandler, dict(
+				path=self._get_profiles_folder(),
+				as_attachment=True,
+				path_validation=path_validation_factory(lambda path: not is_hidden_path(path), status_code=404),
+				access_validation=access_validation_factory(app, permission_validator, Permissions.ADMIN)))
+		]
+
 	# Softwareupdate hook
 
 	def get_update_information(self):
@@ -113,7 +210,10 @@ class DSFPrinterPlugin(
 			return None
 
 		self.comm_instance = comm_instance
-		self.printer = simple_printer.SimplePrinter(self._settings)
+		if self._settings.get_boolean(["outOfProcess"]):
+			self.printer = process_printer.ProcessPrinter(self._settings)
+		else:
+			self.printer = simple_printer.SimplePrinter(self._settings)
 
 		import logging.handlers
 		from octoprint.logging.handlers import CleaningTimedRotatingFileHandler
@@ -126,16 +226,43 @@ class DSFPrinterPlugin(
 		serial_log_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
 		serial_log_handler.setLevel(logging.DEBUG)
 
+		from .log_writer import BackgroundLogHandler, compress_rotated
+
+		if self._settings.get_boolean(["serialLogCompress"]):
+			compress_rotated(serial_log_handler)
+		serial_log_handler = BackgroundLogHandler(
+			serial_log_handler,
+			capacity=self._settings.get_int(["serialLogQueueSize"]),
+			batch_size=self._settings.get_int(["serialLogBatchSize"]))
+
+		serial_log_level = logging.getLevelName(str(self._settings.get(["serialLogLevel"])).upper())
+		if not isinstance(serial_log_level, int):
+			self._logger.warning("Unknown serialLogLevel {}, using INFO".format(self._settings.get(["serialLogLevel"])))
+			serial_log_level = logging.INFO
+
+		recorder = None
+		if self._settings.get_boolean(["recordSessions"]):
+			from .session_recorder import SessionRecorder, prune_traces
+
+			sessions_folder = os.path.join(self.get_plugin_data_folder(), "sessions")
+			os.makedirs(sessions_folder, exist_ok=True)
+			recorder = SessionRecorder(
+				os.path.join(sessions_folder, time.strftime("session-%Y%m%d-%H%M%S") + SessionRecorder.SUFFIX))
+			prune_traces(sessions_folder, self._settings.get_int(["recordSessionsKeep"]))
+
 		from . import simple_serial
 
 		serial_obj = simple_serial.Serial(
 			self.printer,
 			self._settings,
 			serial_log_handler=serial_log_handler,
+			serial_log_level=serial_log_level,
+			recorder=recorder,
 			read_timeout=float(read_timeout),
 			faked_baudrate=baudrate)
 
 		self._logger.info("-DSFPrinterPlugin.dsfprinter_factory port=" + str(port))
+		self.serial = serial_obj
 		return serial_obj
 
 	def get_additional_port_names(self, *args, **kwargs):
@@ -160,5 +287,6 @@ def __plugin_load__():
 	__plugin_hooks__ = {
 		"octoprint.plugin.softwareupdate.check_config": __plugin_implementation__.get_update_information,
 		"octoprint.comm.transport.serial.factory": plugin.dsfprinter_printer_factory,
-		"octoprint.comm.transport.serial.additional_port_names": plugin.get_additional_port_names
+		"octoprint.comm.transport.serial.additional_port_names": plugin.get_additional_port_names,
+		"octoprint.server.http.routes": plugin.get_server_routes
 	}
@@ -9,6 +9,7 @@ class Gcode:
 	def __init__(self, line: str = None):
 		self._code = None
 		self._command = None
+		self._line_number = None
 		self._args: dict[str, str] = dict()
 		self._comment = None
 		self._checksum = 0
@@ -24,6 +25,10 @@ class Gcode:
 	def command(self):
 		return self._command
 
+	@property
+	def line_number(self):
+		return self._line_number
+
 	@property
 	def args(self):
 		return self._args
@@ -53,7 +58,10 @@ class Gcode:
 		self.logger.debug("parse_words words='{}'".format(checksum_words[0]))
 		for word in checksum_words[0].split():
 			self.logger.debug("parse_words word='{}'".format(word))
-			if word[0] in ['M', 'G', 'F', 'T']:
+			if word[0] == 'N' and self._command is None and self._line_number is None and self._is_int(word[1:]):
+				self.logger.debug("parse_words line number")
+				self._line_number = int(word[1:])
+			elif word[0] in ['M', 'G', 'F', 'T'] and self._command is None:
 				self.logger.debug("parse_words word in [MGFT]")
 				self._code = word[0]
 				self._command = word
@@ -61,9 +69,17 @@ class Gcode:
 				self.logger.debug("parse_words other word")
 				self._args[word[0]] = word[1:]
 
+	@staticmethod
+	def _is_int(value: str) -> bool:
+		try:
+			int(value)
+			return True
+		except ValueError:
+			return False
+
 	def __str__(self) -> str:
-		return "Gcode(code={}, command={}, args{}, comment={}, checksum={})".format(
-			self._code, self._command, self._args, self._comment, self._checksum)
+		return "Gcode(line_number={}, code={}, command={}, args{}, comment={}, checksum={})".format(
+			self._line_number, self._code, self._command, self._args, self._comment, self._checksum)
 
 if __name__ == '__main__':
 	logging.basicConfig(level=logging.DEBUG)
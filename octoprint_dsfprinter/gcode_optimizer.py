@@ -0,0 +1,144 @@
+import logging
+import re
+import time
+from typing import Callable, Optional
+
+from octoprint_dsfprinter.gcode import Gcode
+
+
+class GcodeOptimizer:
+	"""Optional write path stage eliding lines DSF does not need
+
+	Lines are parsed into `Gcode` objects and
+	- comment-only and empty lines are dropped,
+	- repeated `M105` within `interval` seconds are answered from the last real response,
+	- `F` words repeating the current feedrate of a move are removed, moves left without words are dropped,
+	- fan and temperature sets repeating the previous set of the same group within `interval` seconds are
+	  dropped. A set without `P` or `T` addresses whatever fan or heater is current, so a set of a group
+	  only counts as repeated if it is identical to the last set of that group. Any other command, e.g.
+	  `M109`, `G10` or a tool change, may change fan and heater state and forgets the previous sets.
+
+	Every elided line is still answered with an `ok` so OctoPrint's acknowledgement tracking stays intact.
+	Line numbers and checksums only guard the serial link OctoPrint believes it is talking to and are
+	stripped from the lines forwarded to DSF.
+
+	Args:
+		- interval: seconds a cached `M105` response or fan/temperature set stays valid
+	"""
+
+	logger = logging.getLogger(__name__)
+	logger.setLevel(logging.INFO)
+
+	MOVES = ("G0", "G1", "G2", "G3")
+	# fan and temperature sets, mapped to the group of targets they share
+	SETS = {"M104": "M104", "M106": "M106", "M107": "M106", "M140": "M140", "M141": "M141"}
+
+	_LINE_NUMBER = re.compile(r"^\s*N-?\d+\s*")
+	_CHECKSUM = re.compile(r"\*\d+\s*$")
+
+	def __init__(self, interval: float = 6.0):
+		self._interval = interval
+		self._feedrate = None
+		self._temperature_response = None
+		self._temperature_time = 0.0
+		self._sets = dict()
+		self.counters = dict(lines=0, forwarded=0, elided=0, compacted=0, bytes_saved=0)
+
+	def command(self, line: str, send: Callable[[str], str]) -> str:
+		"""Optimize `line`, forward what is left through `send` and return the response for OctoPrint"""
+		self.counters["lines"] += 1
+		gcode = Gcode(line)
+		now = time.monotonic()
+
+		optimized = self._optimize(line, gcode, now)
+		if optimized is None:
+			self.counters["elided"] += 1
+			self.counters["bytes_saved"] += len(line)
+			self.logger.debug("elided line='{}'".format(line.strip()))
+			return self._temperature_response if gcode.command == "M105" else "ok"
+
+		self.counters["forwarded"] += 1
+		self.counters["bytes_saved"] += len(line) - len(optimized)
+		res = send(optimized)
+		self._observe(gcode, res, now)
+		return res
+
+	def reset(self) -> None:
+		"""Forget all modal state, e.g. after a reconnect"""
+		self._feedrate = None
+		self._temperature_response = None
+		self._sets.clear()
+
+	def _optimize(self, line: str, gcode: Gcode, now: float) -> Optional[str]:
+		if gcode.command is None:
+			if not gcode.args:
+				return None
+			# a line we cannot classify, e.g. lowercase g-code, may change any state
+			self._feedrate = None
+			self._forget_sets()
+			return self._strip(line)
+
+		if gcode.command == "M105":
+			if self._temperature_response is not None and now - self._temperature_time < self._interval:
+				return None
+			return self._strip(line)
+
+		if gcode.command in self.MOVES:
+			return self._compact_move(line, gcode)
+
+		if gcode.command in self.SETS:
+			previous = self._sets.get(self.SETS[gcode.command])
+			if previous is not None and previous[0] == (gcode.command, gcode.args) and now - previous[1] < self._interval:
+				return None
+			return self._strip(line)
+
+		# any other command may change the feedrate, fans or heaters behind our back
+		self._feedrate = None
+		self._forget_sets()
+		return self._strip(line)
+
+	def _compact_move(self, line: str, gcode: Gcode) -> Optional[str]:
+		feedrate = self._float(gcode.args.get("F"))
+		if feedrate is None or feedrate != self._feedrate:
+			self._feedrate = feedrate if feedrate is not None else self._feedrate
+			return self._strip(line)
+
+		args = {letter: value for letter, value in gcode.args.items() if letter != "F"}
+		if not args:
+			return None
+		self.counters["compacted"] += 1
+		return "{} {}\n".format(gcode.command, " ".join(letter + value for letter, value in args.items()))
+
+	def _observe(self, gcode: Gcode, res: str, now: float) -> None:
+		if not res.startswith("ok"):
+			# the printer did not accept the line, do not trust our view of its state
+			self.reset()
+			return
+		if gcode.command == "M105":
+			self._temperature_response = res
+			self._temperature_time = now
+		elif gcode.command in self.SETS:
+			# replaces the previous set of the group, whichever fan or heater that one addressed
+			self._sets[self.SETS[gcode.command]] = ((gcode.command, gcode.args), now)
+			# the cached temperature report no longer shows the current targets
+			self._temperature_response = None
+
+	def _forget_sets(self) -> None:
+		if self._sets:
+			self._sets.clear()
+			self._temperature_response = None
+
+	def _strip(self, line: str) -> str:
+		code = line.split(';', maxsplit=1)[0]
+		return self._CHECKSUM.sub("", self._LINE_NUMBER.sub("", code)).rstrip() + "\n"
+
+	@staticmethod
+	def _float(value: Optional[str]) -> Optional[float]:
+		try:
+			return float(value)
+		except (TypeError, ValueError):
+			return None
+
+	def __str__(self) -> str:
+		return "GcodeOptimizer(lines={lines}, forwarded={forwarded}, elided={elided}, " \
+			"compacted={compacted}, bytes_saved={bytes_saved})".format(**self.counters)
@@ -0,0 +1,109 @@
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+
+
+class BackgroundLogHandler(logging.Handler):
+	"""Hands log records to a background thread writing them in batches to a target handler
+
+	`emit` only enqueues the record, so formatting, disk I/O and rotation of the target handler stay off
+	the calling thread. The queue is bounded, records arriving while it is full are dropped and counted,
+	and a warning with the number of dropped records is written once the writer caught up.
+
+	For `logging.StreamHandler` targets, e.g. the rotating file handlers, a batch is written with a single
+	flush instead of one per record.
+
+	Args:
+		- target: handler the records are finally written to, owned and closed by this handler
+		- capacity: maximum number of records waiting to be written
+		- batch_size: maximum number of records written per flush
+	"""
+
+	def __init__(self, target: logging.Handler, capacity: int = 10000, batch_size: int = 256):
+		super().__init__()
+		self.target = target
+		self.batch_size = batch_size
+		self.dropped = 0
+		self._reported = 0
+		self._queue = queue.Queue(maxsize=capacity)
+		self._stop = object()
+		self._thread = threading.Thread(
+			target=self._run, name="octoprint.plugins.dsfprinter.serial_log_thread", daemon=True)
+		self._thread.start()
+
+	def emit(self, record: logging.LogRecord) -> None:
+		try:
+			self._queue.put_nowait(record)
+		except queue.Full:
+			self.dropped += 1
+
+	def close(self) -> None:
+		if self._thread.is_alive():
+			self._queue.put(self._stop)
+			self._thread.join()
+		self.target.close()
+		super().close()
+
+	def _run(self) -> None:
+		while True:
+			batch = [self._queue.get()]
+			while len(batch) < self.batch_size:
+				try:
+					batch.append(self._queue.get_nowait())
+				except queue.Empty:
+					break
+
+			stop = self._stop in batch
+			records = [record for record in batch if record is not self._stop]
+			dropped = self.dropped
+			if dropped > self._reported:
+				records.append(logging.makeLogRecord(dict(
+					name=records[-1].name if records else __name__, levelno=logging.WARNING, levelname="WARNING",
+					msg="dropped {} serial log records".format(dropped - self._reported))))
+				self._reported = dropped
+			self._write(records)
+			if stop:
+				return
+
+	# noinspection PyBroadException
+	def _write(self, records) -> None:
+		target = self.target
+		if not isinstance(target, logging.StreamHandler) or target.stream is None:
+			for record in records:
+				target.handle(record)
+			return
+
+		target.acquire()
+		try:
+			for record in records:
+				if record.levelno < target.level or not target.filter(record):
+					continue
+				try:
+					if isinstance(target, logging.handlers.BaseRotatingHandler) and target.shouldRollover(record):
+						target.doRollover()
+					target.stream.write(target.format(record) + target.terminator)
+				except Exception:
+					target.handleError(record)
+			target.flush()
+		finally:
+			target.release()
+
+
+def compress_rotated(handler: logging.handlers.BaseRotatingHandler) -> None:
+	"""Let `handler` gzip its log files when rotating them"""
+	handler.namer = _gzip_namer
+	handler.rotator = _gzip_rotator
+
+
+def _gzip_namer(name: str) -> str:
+	return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+	with open(source, "rb") as sf, gzip.open(dest, "wb") as df:
+		shutil.copyfileobj(sf, df)
+	os.remove(source)
@@ -0,0 +1,239 @@
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import threading
+import time
+from threading import Condition, Event
+from typing import Optional
+
+from pydsfapi.pydsfapi import TaskCanceledException, InternalServerException
+
+from octoprint_dsfprinter.shm_ring import LineRing
+
+# first line the worker posts on the responses ring
+_READY = "ready"
+_ERROR = "error: "
+_TRUNCATED = "\n// truncated, increase ringBufferSize"
+
+
+class ProcessPrinter:
+	"""Drop-in replacement for `SimplePrinter` running the DSF connections in a separate process
+
+	`SimplePrinter` and the intercept loop live in a spawned worker process, commands, responses and
+	intercepted codes are exchanged through `LineRing` shared memory buffers. This keeps the per-line
+	work off the GIL OctoPrint's server and the other plugins compete for. Log records of the worker are
+	sent back through a queue and handled by the loggers of the same name in this process.
+
+	The constructor waits until the worker connected to DSF and raises `ConnectionError` if it could not.
+
+	Args:
+		- settings: plugin settings, the worker receives a snapshot of them
+		- printer_factory: picklable callable creating the printer in the worker, `SimplePrinter` by default
+	"""
+
+	logger = logging.getLogger(__name__)
+	logger.setLevel(logging.DEBUG)
+
+	_POLL_INTERVAL = 0.5
+	_JOIN_TIMEOUT = 5.0
+	_STARTUP_TIMEOUT = 60.0
+
+	def __init__(self, settings, printer_factory=None):
+		self.logger.debug("+__init__")
+		self.settings = settings
+
+		self.subscribed = Event()
+		self.subscribed.clear()
+
+		ring_size = settings.get_int(["ringBufferSize"])
+		ctx = multiprocessing.get_context("spawn")
+		self._commands = LineRing(ring_size, ctx=ctx)
+		self._responses = LineRing(ring_size, ctx=ctx)
+		self._intercepts = LineRing(ring_size, ctx=ctx)
+		self._stop = ctx.Event()
+
+		self._log_queue = ctx.Queue()
+		self._log_listener = logging.handlers.QueueListener(self._log_queue, _LoggerRouter())
+		self._log_listener.start()
+
+		self.connection_lock = Condition()
+		with self.connection_lock:
+			self._process = ctx.Process(
+				target=_worker_main,
+				args=(
+					settings.get([]), printer_factory, self._commands, self._responses, self._intercepts, self._stop,
+					self._log_queue, logging.getLogger().getEffectiveLevel()),
+				name="octoprint.plugins.dsfprinter.worker",
+				daemon=True)
+			self._process.start()
+			try:
+				self._await_worker()
+			except Exception:
+				self._shutdown()
+				raise
+		self.logger.debug("-__init__ pid={}".format(self._process.pid))
+
+	def subscribe(self):
+		self.logger.debug("+subscribe")
+		with self.connection_lock:
+			if self.subscribed.is_set():
+				raise ConnectionError("already subscribed")
+
+			self.subscribed.set()
+		self.logger.debug("-subscribe")
+
+	def close(self):
+		self.logger.debug("+close")
+		with self.connection_lock:
+			if not self.subscribed.is_set():
+				self.logger.error("already closed")
+				return
+
+			self._shutdown()
+			self.subscribed.clear()
+		self.logger.debug("-close")
+
+	def command(self, cde: str):
+		self.logger.debug("+command(cde={})".format(cde.strip()))
+		with self.connection_lock:
+			if not self.subscribed.is_set():
+				return "// Error, not subscribed"
+			self._commands.put(cde)
+			while True:
+				try:
+					res = self._responses.get(timeout=self._POLL_INTERVAL)
+					break
+				except queue.Empty:
+					if not self._process.is_alive():
+						return "// Error, DSF worker exited with {}".format(self._process.exitcode)
+			self.logger.debug("-command()->{}".format(res))
+			return res
+
+	def intercept(self):
+		# type: () -> Optional[str]
+		self.logger.debug("+intercept")
+		if not self.subscribed.is_set():
+			self.logger.debug("not subscribed in intercept")
+			return None
+
+		try:
+			cde = self._intercepts.get(timeout=self._POLL_INTERVAL)
+		except queue.Empty:
+			return None
+		self.logger.debug("-intercept code={}".format(cde))
+		return cde
+
+	def _await_worker(self):
+		deadline = time.monotonic() + self._STARTUP_TIMEOUT
+		while True:
+			try:
+				res = self._responses.get(timeout=self._POLL_INTERVAL)
+				break
+			except queue.Empty:
+				if not self._process.is_alive():
+					raise ConnectionError("DSF worker exited with {}".format(self._process.exitcode))
+				if time.monotonic() > deadline:
+					raise ConnectionError("DSF worker did not start within {}s".format(self._STARTUP_TIMEOUT))
+		if res != _READY:
+			raise ConnectionError(res[len(_ERROR):] if res.startswith(_ERROR) else res)
+
+	def _shutdown(self):
+		self._stop.set()
+		self._process.join(self._JOIN_TIMEOUT)
+		if self._process.is_alive():
+			self.logger.error("worker did not stop, terminating pid={}".format(self._process.pid))
+			self._process.terminate()
+		for ring in (self._commands, self._responses, self._intercepts):
+			ring.close()
+		self._log_listener.stop()
+
+
+class _LoggerRouter(logging.Handler):
+	"""Hands records received from the worker to the logger of the same name in this process"""
+
+	def emit(self, record: logging.LogRecord) -> None:
+		logger = logging.getLogger(record.name)
+		if logger.isEnabledFor(record.levelno):
+			logger.handle(record)
+
+
+# noinspection PyBroadException
+def _worker_main(settings, printer_factory, commands, responses, intercepts, stop, log_queue, log_level):
+	# runs in the spawned worker process
+	if printer_factory is None:
+		from octoprint_dsfprinter.simple_printer import SimplePrinter
+		printer_factory = SimplePrinter
+
+	root = logging.getLogger()
+	for handler in list(root.handlers):
+		root.removeHandler(handler)
+	root.addHandler(logging.handlers.QueueHandler(log_queue))
+	root.setLevel(log_level)
+
+	logger = logging.getLogger("{}.worker".format(__name__))
+	try:
+		printer = printer_factory(settings)
+		printer.subscribe()
+	except Exception as e:
+		logger.exception("Could not connect to DSF", exc_info=e)
+		responses.put("{}{}".format(_ERROR, e))
+		return
+	responses.put(_READY)
+
+	intercept_thread = threading.Thread(
+		target=_relay_intercepts, args=(printer, intercepts, stop, logger),
+		name="octoprint.plugins.dsfprinter.intercept_thread", daemon=True)
+	intercept_thread.start()
+
+	try:
+		while not stop.is_set():
+			if not _parent_alive():
+				logger.error("OctoPrint process is gone, stopping DSF worker")
+				break
+			try:
+				line = commands.get(timeout=ProcessPrinter._POLL_INTERVAL)
+			except queue.Empty:
+				continue
+			try:
+				res = printer.command(line)
+			except (TaskCanceledException, InternalServerException) as e:
+				logger.exception("Exception", exc_info=e)
+				res = "// {}".format(e)
+			try:
+				responses.put(res)
+			except ValueError:
+				logger.warning("response of {} characters exceeds the ring, truncating".format(len(res)))
+				responses.put(_truncate(res, responses.capacity))
+	finally:
+		stop.set()
+		printer.close()
+
+
+# noinspection PyBroadException
+def _relay_intercepts(printer, intercepts, stop, logger):
+	while not stop.is_set() and _parent_alive():
+		try:
+			cde = printer.intercept()
+			if cde is not None:
+				intercepts.put(str(cde), timeout=0)
+		except queue.Full:
+			logger.debug("intercept ring full, dropping code")
+		except ValueError:
+			logger.warning("intercepted code exceeds the ring, dropping code")
+		except (InternalServerException, BrokenPipeError, TaskCanceledException) as e:
+			logger.exception("Exception on intercept", exc_info=e)
+		except ConnectionResetError:
+			stop.set()
+
+
+def _parent_alive() -> bool:
+	# daemon workers are only stopped on a clean exit, not when OctoPrint gets killed
+	parent = multiprocessing.parent_process()
+	return parent is None or parent.is_alive()
+
+
+def _truncate(line: str, capacity: int) -> str:
+	# leave room for the length prefix of the ring record and the marker
+	size = capacity - LineRing.RECORD_OVERHEAD - len(_TRUNCATED.encode("utf-8"))
+	return line.encode("utf-8", errors="replace")[:size].decode("utf-8", errors="ignore") + _TRUNCATED
@@ -0,0 +1,68 @@
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+
+
+class SamplingProfiler:
+	"""Samples the stacks of the threads currently running plugin code
+
+	Every `interval` seconds the frames of all threads are inspected and the stacks containing a frame
+	from this package, e.g. the `_process_queue` worker or an OctoPrint thread inside `Serial.write` or
+	`Serial.readline`, are counted. The result is written in the collapsed stack format understood by
+	flame graph tools, one `thread;outer frame;...;inner frame count` line per distinct stack.
+
+	Args:
+		- interval: seconds between two samples
+	"""
+
+	logger = logging.getLogger(__name__)
+
+	PACKAGE_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+	def __init__(self, interval: float = 0.01):
+		self.interval = interval
+		self.samples = 0
+		self.stacks = collections.Counter()
+
+	def run(self, seconds: float) -> collections.Counter:
+		"""Sample for `seconds` seconds on the calling thread and return the stack counts"""
+		own = threading.get_ident()
+		deadline = time.monotonic() + seconds
+		while time.monotonic() < deadline:
+			names = None
+			for ident, frame in sys._current_frames().items():
+				if ident == own or not self._in_plugin(frame):
+					continue
+				if names is None:
+					names = {thread.ident: thread.name for thread in threading.enumerate()}
+				self.stacks["{};{}".format(names.get(ident, ident), self._collapse(frame))] += 1
+			self.samples += 1
+			time.sleep(self.interval)
+		self.logger.debug("run() samples={} stacks={}".format(self.samples, len(self.stacks)))
+		return self.stacks
+
+	def write_collapsed(self, path: str) -> None:
+		with open(path, "w", encoding="utf-8") as f:
+			for stack, count in self.stacks.most_common():
+				f.write("{} {}\n".format(stack, count))
+
+	def _in_plugin(self, frame) -> bool:
+		# cheap check on the file names only, most threads of OctoPrint never run plugin code
+		while frame is not None:
+			if frame.f_code.co_filename.startswith(self.PACKAGE_FOLDER):
+				return True
+			frame = frame.f_back
+		return False
+
+	@staticmethod
+	def _collapse(frame) -> str:
+		frames = []
+		while frame is not None:
+			frames.append(frame)
+			frame = frame.f_back
+		return ";".join(
+			"{} ({}:{})".format(frame.f_code.co_name, os.path.basename(frame.f_code.co_filename), frame.f_lineno)
+			for frame in reversed(frames))
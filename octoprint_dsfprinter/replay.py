@@ -0,0 +1,163 @@
+"""
+Replays a session trace recorded by `SessionRecorder` through `Serial`
+
+	python -m octoprint_dsfprinter.replay [--fast] [--optimize] TRACE
+
+The DSF side is played by `TracePrinter`, a fake endpoint with the `SimplePrinter` interface answering
+every command with a response recorded for the same command and emitting the recorded intercepted codes. The
+lines are written at their original pace, or as fast as possible with `--fast`, and the time spent
+in `Serial.write` is reported so slowdowns seen in production can be reproduced and compared.
+"""
+import argparse
+import collections
+import logging
+import threading
+import time
+from typing import Optional
+
+from octoprint_dsfprinter.gcode import Gcode
+from octoprint_dsfprinter.session_recorder import SessionRecorder, read_trace
+from octoprint_dsfprinter.simple_serial import Serial
+
+
+class TracePrinter:
+	"""Fake DSF endpoint answering from a recorded trace
+
+	Every recorded response is paired with the oldest recorded write still waiting for one and queued
+	under that write's command. A command is answered with the next response queued for the same
+	command, so lines the optimizer elides or compacts during the replay do not shift the responses of
+	the following commands. Unless replaying fast, a command is answered only after the time that passed
+	between the recorded write and its response, so slow DSF replies are reproduced as well.
+	"""
+
+	_IDLE_INTERVAL = 0.1
+
+	def __init__(self, path: str, fast: bool = False):
+		self.fast = fast
+		self.subscribed = threading.Event()
+		self.responses = collections.defaultdict(collections.deque)
+		self.intercepts = collections.deque()
+		pending = collections.deque()
+		for timestamp, kind, line in read_trace(path):
+			if kind == SessionRecorder.WRITE:
+				pending.append((self._key(line), timestamp))
+			elif kind == SessionRecorder.READ and pending:
+				key, written = pending.popleft()
+				self.responses[key].append((timestamp - written, line))
+			elif kind == SessionRecorder.INTERCEPT:
+				self.intercepts.append((timestamp, line))
+		self.start = time.monotonic()
+
+	def subscribe(self):
+		if self.subscribed.is_set():
+			raise ConnectionError("already subscribed")
+		self.subscribed.set()
+
+	def close(self):
+		self.subscribed.clear()
+
+	def command(self, cde: str):
+		if not self.subscribed.is_set():
+			return "// Error, not subscribed"
+		try:
+			latency, line = self.responses[self._key(cde)].popleft()
+		except IndexError:
+			return "ok"
+		if not self.fast:
+			time.sleep(latency)
+		return line
+
+	def intercept(self):
+		# type: () -> Optional[str]
+		if not self.subscribed.is_set() or not self.intercepts:
+			time.sleep(self._IDLE_INTERVAL)
+			return None
+		timestamp, line = self.intercepts.popleft()
+		if not self.fast:
+			_sleep_until(self.start + timestamp)
+		return line
+
+	@staticmethod
+	def _key(line: str) -> str:
+		gcode = Gcode(line)
+		return gcode.command if gcode.command is not None else line.strip()
+
+
+class ReplaySettings(dict):
+	"""Minimal stand-in for the plugin settings `Serial` reads"""
+
+	def get(self, path, **kwargs):
+		if not path:
+			return dict(self)
+		return super().get(path[0])
+
+	def get_boolean(self, path, **kwargs):
+		return bool(self.get(path))
+
+	def get_float(self, path, **kwargs):
+		return float(self.get(path))
+
+	def get_int(self, path, **kwargs):
+		return int(self.get(path))
+
+
+def replay(path: str, fast: bool = False, optimize: bool = False) -> dict:
+	"""Feed the writes of trace `path` through a `Serial` talking to a `TracePrinter`, return timing stats"""
+	settings = ReplaySettings(optimizeStream=optimize, optimizeInterval=6.0)
+	printer = TracePrinter(path, fast=fast)
+	serial = Serial(printer, settings, read_timeout=0.1)
+
+	reading = threading.Event()
+	reading.set()
+	reader = threading.Thread(target=_drain, args=(serial, reading), name="replay.read_thread", daemon=True)
+	reader.start()
+
+	durations = []
+	start = time.monotonic()
+	printer.start = start
+	for timestamp, kind, line in read_trace(path):
+		if kind != SessionRecorder.WRITE:
+			continue
+		if not fast:
+			_sleep_until(start + timestamp)
+		before = time.perf_counter()
+		serial.write(line.encode("utf-8"))
+		durations.append(time.perf_counter() - before)
+	elapsed = time.monotonic() - start
+
+	reading.clear()
+	reader.join()
+	serial.close()
+
+	durations.sort()
+	return dict(
+		lines=len(durations),
+		elapsed=elapsed,
+		write_mean=sum(durations) / len(durations) if durations else 0.0,
+		write_p99=durations[int(len(durations) * 0.99)] if durations else 0.0,
+		write_max=durations[-1] if durations else 0.0)
+
+
+def _drain(serial: Serial, reading: threading.Event):
+	while reading.is_set():
+		serial.readline()
+
+
+def _sleep_until(deadline: float):
+	delay = deadline - time.monotonic()
+	if delay > 0:
+		time.sleep(delay)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Replay a DSFPrinter session trace through Serial")
+	parser.add_argument("trace", help="trace file written by the session recorder")
+	parser.add_argument("--fast", action="store_true", help="replay as fast as possible instead of at original speed")
+	parser.add_argument("--optimize", action="store_true", help="enable the G-code stream optimizer")
+	args = parser.parse_args()
+
+	# keep the per-line debug logging of Serial out of the measurement
+	logging.disable(logging.INFO)
+	stats = replay(args.trace, fast=args.fast, optimize=args.optimize)
+	print("lines={lines} elapsed={elapsed:.3f}s write_mean={write_mean:.6f}s "
+		"write_p99={write_p99:.6f}s write_max={write_max:.6f}s".format(**stats))
@@ -0,0 +1,80 @@
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Iterator, Tuple
+
+
+class SessionRecorder:
+	"""Records a plugin session to a compact binary trace
+
+	The trace starts with `MAGIC` followed by one record per event: monotonic seconds since the start of
+	the recording, the event kind and the length prefixed utf-8 line. Records are packed and appended
+	to a buffered file without any formatting, so recording is cheaper than the text serial log.
+
+	Args:
+		- path: file the trace is written to
+	"""
+
+	logger = logging.getLogger(__name__)
+
+	MAGIC = b"DSFTRACE\x01"
+	SUFFIX = ".dsftrace"
+
+	WRITE = 1
+	READ = 2
+	INTERCEPT = 3
+
+	_RECORD = struct.Struct("<dBI")
+	_BUFFER_SIZE = 64 * 1024
+
+	def __init__(self, path: str):
+		self.path = path
+		self._lock = threading.Lock()
+		self._file = open(path, "wb", buffering=self._BUFFER_SIZE)
+		self._file.write(self.MAGIC)
+		self._start = time.monotonic()
+		self.logger.info("recording session to {}".format(path))
+
+	def record(self, kind: int, line: str) -> None:
+		data = line.encode("utf-8", errors="replace")
+		record = self._RECORD.pack(time.monotonic() - self._start, kind, len(data)) + data
+		with self._lock:
+			if self._file is not None:
+				self._file.write(record)
+
+	def close(self) -> None:
+		with self._lock:
+			if self._file is None:
+				return
+			self._file.close()
+			self._file = None
+		self.logger.info("recorded session to {}".format(self.path))
+
+
+def read_trace(path: str) -> Iterator[Tuple[float, int, str]]:
+	"""Yield the `(timestamp, kind, line)` records of a trace written by `SessionRecorder`"""
+	record = SessionRecorder._RECORD
+	with open(path, "rb") as f:
+		if f.read(len(SessionRecorder.MAGIC)) != SessionRecorder.MAGIC:
+			raise ValueError("{} is not a session trace".format(path))
+		while True:
+			header = f.read(record.size)
+			if len(header) < record.size:
+				# end of trace, or a trace cut short by a crash
+				return
+			timestamp, kind, length = record.unpack(header)
+			data = f.read(length)
+			if len(data) < length:
+				return
+			yield timestamp, kind, data.decode("utf-8", errors="replace")
+
+
+def prune_traces(folder: str, keep: int) -> None:
+	"""Delete all but the `keep` most recently modified traces in `folder`"""
+	paths = [os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(SessionRecorder.SUFFIX)]
+	paths.sort(key=lambda path: (os.path.getmtime(path), path), reverse=True)
+	for path in paths[max(keep, 1):]:
+		SessionRecorder.logger.info("removing old session trace {}".format(path))
+		os.remove(path)
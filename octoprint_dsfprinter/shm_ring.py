@@ -0,0 +1,114 @@
+import logging
+import multiprocessing
+import queue
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Optional
+
+
+class LineRing:
+	"""Single producer / single consumer ring buffer of text lines in shared memory
+
+	The segment starts with a header holding the monotonic head (write) and tail (read) byte counters,
+	followed by the data area. Every line is stored as a length prefixed utf-8 record which may wrap
+	around the end of the data area. A semaphore counts the records available to the consumer so
+	`get` can block without polling.
+
+	Instances can be handed to a `multiprocessing.Process` as argument, the child attaches to the
+	same segment by name. Only the creating side unlinks the segment on `close`.
+
+	Args:
+		- capacity: size of the data area in bytes
+		- ctx: multiprocessing context used to create the semaphore
+	"""
+
+	logger = logging.getLogger(__name__)
+
+	_HEADER = struct.Struct("<QQ")
+	_LENGTH = struct.Struct("<I")
+
+	# bytes a record needs in addition to the encoded line
+	RECORD_OVERHEAD = _LENGTH.size
+	_FULL_POLL_INTERVAL = 0.001
+
+	def __init__(self, capacity: int = 65536, ctx=None):
+		if capacity <= self._LENGTH.size:
+			raise ValueError("capacity too small: {}".format(capacity))
+		ctx = ctx if ctx is not None else multiprocessing.get_context()
+		self._capacity = capacity
+		self._shm = shared_memory.SharedMemory(create=True, size=self._HEADER.size + capacity)
+		self._HEADER.pack_into(self._shm.buf, 0, 0, 0)
+		self._items = ctx.Semaphore(0)
+		self._owner = True
+
+	def __getstate__(self):
+		return self._shm.name, self._capacity, self._items
+
+	def __setstate__(self, state):
+		name, self._capacity, self._items = state
+		self._shm = shared_memory.SharedMemory(name=name)
+		self._owner = False
+
+	@property
+	def name(self) -> str:
+		return self._shm.name
+
+	@property
+	def capacity(self) -> int:
+		return self._capacity
+
+	def put(self, line: str, timeout: Optional[float] = None) -> None:
+		"""Append a line, wait up to `timeout` seconds for free space, raise `queue.Full` otherwise"""
+		data = line.encode("utf-8", errors="replace")
+		record = self._LENGTH.pack(len(data)) + data
+		if len(record) > self._capacity:
+			raise ValueError("line of {} bytes exceeds ring capacity {}".format(len(data), self._capacity))
+
+		deadline = None if timeout is None else time.monotonic() + timeout
+		while True:
+			head, tail = self._HEADER.unpack_from(self._shm.buf, 0)
+			if self._capacity - (head - tail) >= len(record):
+				break
+			if deadline is not None and time.monotonic() >= deadline:
+				raise queue.Full
+			time.sleep(self._FULL_POLL_INTERVAL)
+
+		self._copy_in(head, record)
+		struct.pack_into("<Q", self._shm.buf, 0, head + len(record))
+		self._items.release()
+
+	def get(self, timeout: Optional[float] = None) -> str:
+		"""Remove and return the oldest line, raise `queue.Empty` if none arrives within `timeout` seconds"""
+		if not self._items.acquire(timeout=timeout):
+			raise queue.Empty
+		tail = struct.unpack_from("<Q", self._shm.buf, 8)[0]
+		length = self._LENGTH.unpack(self._copy_out(tail, self._LENGTH.size))[0]
+		data = self._copy_out(tail + self._LENGTH.size, length)
+		struct.pack_into("<Q", self._shm.buf, 8, tail + self._LENGTH.size + length)
+		return data.decode("utf-8", errors="replace")
+
+	def close(self) -> None:
+		self._shm.close()
+		if self._owner:
+			try:
+				self._shm.unlink()
+			except FileNotFoundError:
+				self.logger.debug("shared memory {} already unlinked".format(self._shm.name))
+
+	def _copy_in(self, position: int, data: bytes) -> None:
+		offset = position % self._capacity
+		first = min(len(data), self._capacity - offset)
+		base = self._HEADER.size
+		self._shm.buf[base + offset:base + offset + first] = data[:first]
+		if first < len(data):
+			self._shm.buf[base:base + len(data) - first] = data[first:]
+
+	def _copy_out(self, position: int, length: int) -> bytes:
+		offset = position % self._capacity
+		first = min(length, self._capacity - offset)
+		base = self._HEADER.size
+		data = bytes(self._shm.buf[base + offset:base + offset + first])
+		if first < length:
+			data += bytes(self._shm.buf[base:base + length - first])
+		return data
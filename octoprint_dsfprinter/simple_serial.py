@@ -7,12 +7,15 @@ __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agp
 import logging
 import threading
 import queue
+from typing import Optional
 
 from octoprint.util import to_bytes, to_unicode
 
 # noinspection PyBroadException
 from pydsfapi.pydsfapi import TaskCanceledException, InternalServerException
 
+from octoprint_dsfprinter.gcode_optimizer import GcodeOptimizer
+from octoprint_dsfprinter.session_recorder import SessionRecorder
 from octoprint_dsfprinter.simple_printer import SimplePrinter
 
 
@@ -25,22 +28,29 @@ class Serial(object):
 	serial_log.propagate = False
 
 	def __init__(
-			self, printer: SimplePrinter, settings, serial_log_handler=None,
-			read_timeout=5.0, write_timeout=10.0, faked_baudrate=115200):
+			self, printer: SimplePrinter, settings, serial_log_handler=None, serial_log_level=logging.INFO,
+			recorder: SessionRecorder = None, read_timeout=5.0, write_timeout=10.0, faked_baudrate=115200):
 		self.logger.debug("+__init__")
 
 		self._settings = settings
 		self._fake_baudrate = faked_baudrate
 
+		self._serial_log_handler = serial_log_handler
 		if serial_log_handler is not None:
 			import logging.handlers
 			self.serial_log.addHandler(serial_log_handler)
-			self.serial_log.setLevel(logging.INFO)
+			self.serial_log.setLevel(serial_log_level)
 		self.serial_log.info(u"-" * 78)
 
+		self._recorder = recorder
+
 		self._read_timeout = read_timeout
 		self._write_timeout = write_timeout
 
+		self._optimizer = None
+		if self._settings.get_boolean(["optimizeStream"]):
+			self._optimizer = GcodeOptimizer(interval=self._settings.get_float(["optimizeInterval"]))
+
 		self.queue = queue.Queue()
 		# self._queue_lock = threading.Condition()
 
@@ -86,15 +96,28 @@ class Serial(object):
 		self.logger.debug("baudrate -> {}s".format(self._fake_baudrate))
 		return self._fake_baudrate
 
+	@property
+	def optimizer_counters(self):
+		# type: () -> Optional[dict]
+		if self._optimizer is None:
+			return None
+		return dict(self._optimizer.counters)
+
 	def write(self, data):
 		# type: (bytes) -> int
 		# data = data.strip()
 		self.logger.debug("+write({})".format(data))
-		self.serial_log.info(">> {}".format(data.strip()))
+		if self.serial_log.isEnabledFor(logging.INFO):
+			self.serial_log.info(">> {}".format(data.strip()))
 		b = to_bytes(data, errors="replace")
 		u_bytes = to_unicode(b, errors="replace")
+		if self._recorder is not None:
+			self._recorder.record(SessionRecorder.WRITE, u_bytes)
 		try:
-			res = self._printer.command(u_bytes)
+			if self._optimizer is not None:
+				res = self._optimizer.command(u_bytes, self._printer.command)
+			else:
+				res = self._printer.command(u_bytes)
 			self._publish(res)
 		except(TaskCanceledException, InternalServerException) as e:
 			self.logger.exception("Exception", exc_info=e)
@@ -109,7 +132,10 @@ class Serial(object):
 			# fetch a line from the queue, wait no longer than timeout
 			line = to_unicode(self.queue.get(timeout=self._read_timeout), errors="replace")
 			self.queue.task_done()
-			self.serial_log.info(u"<< {}".format(line.strip()))
+			if self._recorder is not None:
+				self._recorder.record(SessionRecorder.READ, line)
+			if self.serial_log.isEnabledFor(logging.INFO):
+				self.serial_log.info(u"<< {}".format(line.strip()))
 			self.logger.debug("-readline()->{}".format(line))
 			return to_bytes(line)
 		except queue.Empty:
@@ -121,6 +147,13 @@ class Serial(object):
 		self.logger.debug("+close()")
 		self.queue = None
 		self._printer.close()
+		if self._optimizer is not None:
+			self.logger.info("close() {}".format(self._optimizer))
+		if self._recorder is not None:
+			self._recorder.close()
+		if self._serial_log_handler is not None:
+			self.serial_log.removeHandler(self._serial_log_handler)
+			self._serial_log_handler.close()
 		self.logger.debug("-close()")
 
 	def _publish(self, line):
@@ -139,6 +172,8 @@ class Serial(object):
 				if cde is not None:
 					data = to_unicode(cde.__str__(), encoding="ascii", errors="replace").strip()
 					self.logger.debug("process_queue data={}".format(data))
+					if self._recorder is not None:
+						self._recorder.record(SessionRecorder.INTERCEPT, data)
 					# self._publish(data)
 				else:
 					self.logger.debug("process_queue cde was None")
@@ -147,4 +182,4 @@ class Serial(object):
 			except ConnectionResetError:
 				self.close()
 			finally:
-				self.logger.debug("+_process_queue qsize={}".format(self.queue.qsize()))
+				self.logger.debug("-_process_queue closed={}".format(self.queue is None))
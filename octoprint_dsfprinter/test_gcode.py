@@ -34,3 +34,18 @@ class TestGcode(TestCase):
 		self.assertEqual("M110", gcode.command)
 		self.assertEqual(125, gcode.checksum)
 		self.assertIsNone(gcode.comment)
+
+	def test_code4(self):
+		with CaptureLogger(Gcode.logger):
+			gcode = Gcode("N42 G1 X10 F1200 T1*7")
+		self.assertEqual(42, gcode.line_number)
+		self.assertEqual("G", gcode.code)
+		self.assertEqual("G1", gcode.command)
+		self.assertEqual({"X": "10", "F": "1200", "T": "1"}, gcode.args)
+
+	def test_code5(self):
+		with CaptureLogger(Gcode.logger):
+			gcode = Gcode("N M105")
+		self.assertIsNone(gcode.line_number)
+		self.assertEqual("M105", gcode.command)
+		self.assertEqual({"N": ""}, gcode.args)
@@ -0,0 +1,115 @@
+from unittest import TestCase
+
+from octoprint_dsfprinter.capture_logger import CaptureLogger
+from octoprint_dsfprinter.gcode import Gcode
+from octoprint_dsfprinter.gcode_optimizer import GcodeOptimizer
+
+
+class TestGcodeOptimizer(TestCase):
+
+	def setUp(self) -> None:
+		super().setUp()
+		self.optimizer = GcodeOptimizer(interval=60.0)
+		self.sent = []
+
+	def _send(self, line):
+		self.sent.append(line)
+		return "ok T:21.3 /0.0" if line.startswith("M105") else "ok"
+
+	def _command(self, line):
+		with CaptureLogger(Gcode.logger):
+			return self.optimizer.command(line, self._send)
+
+	def test_comment_only(self):
+		self.assertEqual("ok", self._command("; layer 1\n"))
+		self.assertEqual([], self.sent)
+		self.assertEqual(1, self.optimizer.counters["elided"])
+
+	def test_strip_line_number(self):
+		self.assertEqual("ok", self._command("N10 M110 N10*118\n"))
+		self.assertEqual(["M110 N10\n"], self.sent)
+
+	def test_repeated_m105(self):
+		self.assertEqual("ok T:21.3 /0.0", self._command("M105\n"))
+		self.assertEqual("ok T:21.3 /0.0", self._command("M105\n"))
+		self.assertEqual(["M105\n"], self.sent)
+
+	def test_modal_feedrate(self):
+		self._command("G1 X10 F1200\n")
+		self._command("G1 X20 F1200\n")
+		self._command("G1 F1200\n")
+		self._command("G1 X30 F600\n")
+		self.assertEqual(["G1 X10 F1200\n", "G1 X20\n", "G1 X30 F600\n"], self.sent)
+		self.assertEqual(1, self.optimizer.counters["compacted"])
+		self.assertEqual(1, self.optimizer.counters["elided"])
+
+	def test_feedrate_reset(self):
+		self._command("G1 X10 F1200\n")
+		self._command("G28\n")
+		self._command("G1 X20 F1200\n")
+		self.assertEqual(["G1 X10 F1200\n", "G28\n", "G1 X20 F1200\n"], self.sent)
+
+	def test_unclassified_line_resets_state(self):
+		self._command("G1 X1 F1200\n")
+		self._command("M106 S255\n")
+		self._command("g1 f600\n")
+		self._command("G1 X2 F1200\n")
+		self._command("M106 S255\n")
+		self.assertEqual(["G1 X1 F1200\n", "M106 S255\n", "g1 f600\n", "G1 X2 F1200\n", "M106 S255\n"], self.sent)
+
+	def test_duplicate_sets(self):
+		self._command("M106 S255\n")
+		self._command("M106 S255\n")
+		self._command("M104 S200 T0\n")
+		self._command("M104 S210 T0\n")
+		self.assertEqual(["M106 S255\n", "M104 S200 T0\n", "M104 S210 T0\n"], self.sent)
+
+	def test_fan_off_between_sets(self):
+		self._command("M106 S255\n")
+		self._command("M107\n")
+		self._command("M106 S255\n")
+		self.assertEqual(["M106 S255\n", "M107\n", "M106 S255\n"], self.sent)
+
+	def test_wait_between_sets(self):
+		self._command("M104 S200\n")
+		self._command("M109 S210\n")
+		self._command("M104 S200\n")
+		self.assertEqual(["M104 S200\n", "M109 S210\n", "M104 S200\n"], self.sent)
+
+	def test_tool_change_between_sets(self):
+		self._command("T0\n")
+		self._command("M104 S200\n")
+		self._command("T1\n")
+		self._command("M104 S200\n")
+		self.assertEqual(["T0\n", "M104 S200\n", "T1\n", "M104 S200\n"], self.sent)
+
+	def test_sets_per_group(self):
+		self._command("M106 P0 S255\n")
+		self._command("M106 P0 S255\n")
+		self._command("M106 P1 S128\n")
+		self._command("M106 P0 S255\n")
+		self._command("M104 S200 T0\n")
+		self._command("M104 S200 T1\n")
+		self._command("M104 S200 T0\n")
+		self.assertEqual(
+			["M106 P0 S255\n", "M106 P1 S128\n", "M106 P0 S255\n", "M104 S200 T0\n", "M104 S200 T1\n",
+				"M104 S200 T0\n"],
+			self.sent)
+
+	def test_fan_off_without_index(self):
+		self._command("M106 P0 S255\n")
+		self._command("M107\n")
+		self._command("M106 P0 S255\n")
+		self.assertEqual(["M106 P0 S255\n", "M107\n", "M106 P0 S255\n"], self.sent)
+
+	def test_cooldown_with_index(self):
+		self._command("M104 S200\n")
+		self._command("M104 T0 S0\n")
+		self._command("M104 S200\n")
+		self.assertEqual(["M104 S200\n", "M104 T0 S0\n", "M104 S200\n"], self.sent)
+
+	def test_set_invalidates_m105(self):
+		self._command("M105\n")
+		self._command("M104 S200\n")
+		self._command("M105\n")
+		self.assertEqual(["M105\n", "M104 S200\n", "M105\n"], self.sent)
@@ -0,0 +1,59 @@
+import gzip
+import logging
+import logging.handlers
+import os
+import tempfile
+from io import StringIO
+from unittest import TestCase
+
+from octoprint_dsfprinter.log_writer import BackgroundLogHandler, compress_rotated
+
+
+class TestBackgroundLogHandler(TestCase):
+
+	def setUp(self) -> None:
+		super().setUp()
+		self.logger = logging.getLogger("{}.serial".format(__name__))
+		self.logger.setLevel(logging.INFO)
+		self.logger.propagate = False
+		self.io = StringIO()
+		self.target = logging.StreamHandler(self.io)
+
+	def test_write(self):
+		handler = BackgroundLogHandler(self.target, batch_size=2)
+		self.logger.addHandler(handler)
+		for i in range(5):
+			self.logger.info(">> G1 X{}".format(i))
+		self.logger.removeHandler(handler)
+		handler.close()
+		self.assertEqual("".join(">> G1 X{}\n".format(i) for i in range(5)), self.io.getvalue())
+		self.assertEqual(0, handler.dropped)
+
+	def test_drop(self):
+		handler = BackgroundLogHandler(self.target, capacity=2)
+		self.logger.addHandler(handler)
+		# block the writer on the target so the queue fills up
+		self.target.acquire()
+		try:
+			for i in range(10):
+				self.logger.info(">> G1 X{}".format(i))
+		finally:
+			self.target.release()
+		self.logger.removeHandler(handler)
+		handler.close()
+		self.assertLessEqual(7, handler.dropped)
+		self.assertIn("dropped {} serial log records".format(handler.dropped), self.io.getvalue())
+
+	def test_compress_rotated(self):
+		with tempfile.TemporaryDirectory() as folder:
+			path = os.path.join(folder, "serial.log")
+			target = logging.handlers.RotatingFileHandler(path, maxBytes=1, backupCount=1)
+			compress_rotated(target)
+			handler = BackgroundLogHandler(target)
+			self.logger.addHandler(handler)
+			self.logger.info(">> M105")
+			self.logger.info("<< ok")
+			self.logger.removeHandler(handler)
+			handler.close()
+			with gzip.open(path + ".1.gz", "rt") as f:
+				self.assertEqual(">> M105\n", f.read())
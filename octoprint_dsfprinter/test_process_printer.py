@@ -0,0 +1,127 @@
+import logging
+import multiprocessing
+import os
+import time
+from unittest import TestCase
+
+from octoprint_dsfprinter.capture_logger import CaptureLogger
+from octoprint_dsfprinter.process_printer import ProcessPrinter
+
+WORKER_LOGGER = "octoprint_dsfprinter.process_printer.worker"
+
+
+class EchoPrinter:
+	"""Stands in for `SimplePrinter` in the worker process"""
+
+	def __init__(self, settings):
+		self.settings = settings
+		self.intercepted = False
+
+	def subscribe(self):
+		pass
+
+	def close(self):
+		pass
+
+	def command(self, cde):
+		if cde.strip() == "M122":
+			return "ok " + "x" * 4096
+		return "ok {} {}".format(cde.strip(), self.settings["ringBufferSize"])
+
+	def intercept(self):
+		if not self.intercepted:
+			self.intercepted = True
+			return "M291"
+		time.sleep(0.1)
+		return None
+
+
+class UnreachablePrinter:
+
+	def __init__(self, settings):
+		raise ConnectionRefusedError("DSF socket not found")
+
+
+class Settings(dict):
+
+	def get(self, path, **kwargs):
+		return dict(self)
+
+	def get_int(self, path, **kwargs):
+		return int(self[path[0]])
+
+
+def _start_and_die(pids):
+	# stands in for an OctoPrint process killed without cleaning up its worker
+	printer = ProcessPrinter(Settings(ringBufferSize=1024), printer_factory=EchoPrinter)
+	pids.put(printer._process.pid)
+	pids.close()
+	pids.join_thread()
+	os._exit(1)
+
+
+def _pid_exists(pid):
+	try:
+		os.kill(pid, 0)
+		return True
+	except ProcessLookupError:
+		return False
+
+
+class TestProcessPrinter(TestCase):
+
+	def setUp(self) -> None:
+		super().setUp()
+		self.settings = Settings(ringBufferSize=1024)
+
+	def test_round_trip(self):
+		with CaptureLogger(ProcessPrinter.logger):
+			printer = ProcessPrinter(self.settings, printer_factory=EchoPrinter)
+			printer.subscribe()
+			try:
+				for i in range(200):
+					self.assertEqual("ok G1 X{} 1024".format(i), printer.command("G1 X{}\n".format(i)))
+				intercepted = None
+				for _ in range(20):
+					intercepted = printer.intercept()
+					if intercepted is not None:
+						break
+				self.assertEqual("M291", intercepted)
+			finally:
+				printer.close()
+		self.assertEqual(0, printer._process.exitcode)
+		self.assertEqual("// Error, not subscribed", printer.command("M105\n"))
+
+	def test_oversized_response(self):
+		with CaptureLogger(ProcessPrinter.logger), CaptureLogger(logging.getLogger(WORKER_LOGGER)):
+			printer = ProcessPrinter(self.settings, printer_factory=EchoPrinter)
+			printer.subscribe()
+			try:
+				res = printer.command("M122\n")
+				self.assertTrue(res.startswith("ok xxx"))
+				self.assertTrue(res.endswith("// truncated, increase ringBufferSize"))
+				self.assertLessEqual(len(res.encode("utf-8")), 1024)
+				self.assertEqual("ok M115 1024", printer.command("M115\n"))
+			finally:
+				printer.close()
+		self.assertEqual(0, printer._process.exitcode)
+
+	def test_unreachable(self):
+		with CaptureLogger(ProcessPrinter.logger), CaptureLogger(logging.getLogger(WORKER_LOGGER)) as worker_log:
+			with self.assertRaisesRegex(ConnectionError, "DSF socket not found"):
+				ProcessPrinter(self.settings, printer_factory=UnreachablePrinter)
+		# logged in the worker, handled by the logger of the same name here
+		self.assertIn("Could not connect to DSF", worker_log.out)
+
+	def test_orphaned_worker(self):
+		ctx = multiprocessing.get_context("spawn")
+		pids = ctx.Queue()
+		parent = ctx.Process(target=_start_and_die, args=(pids,))
+		parent.start()
+		pid = pids.get(timeout=30)
+		parent.join(10)
+		for _ in range(50):
+			if not _pid_exists(pid):
+				break
+			time.sleep(0.1)
+		self.assertFalse(_pid_exists(pid))
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from octoprint_dsfprinter.capture_logger import CaptureLogger
+from octoprint_dsfprinter.profiler import SamplingProfiler
+
+
+def _busy(stop):
+	while not stop.is_set():
+		sum(range(1000))
+
+
+class TestSamplingProfiler(TestCase):
+
+	def test_run(self):
+		stop = threading.Event()
+		plugin_thread = threading.Thread(target=_busy, args=(stop,), name="plugin_thread")
+		other_thread = threading.Thread(target=stop.wait, name="other_thread")
+		plugin_thread.start()
+		other_thread.start()
+		try:
+			profiler = SamplingProfiler(interval=0.001)
+			with CaptureLogger(SamplingProfiler.logger):
+				stacks = profiler.run(0.1)
+		finally:
+			stop.set()
+			plugin_thread.join()
+			other_thread.join()
+
+		self.assertLess(0, profiler.samples)
+		self.assertTrue(any(stack.startswith("plugin_thread;") and "_busy (test_profiler.py:" in stack for stack in stacks))
+		self.assertFalse(any(stack.startswith("other_thread;") for stack in stacks))
+
+		fd, path = tempfile.mkstemp(suffix=".folded")
+		os.close(fd)
+		try:
+			profiler.write_collapsed(path)
+			with open(path, encoding="utf-8") as f:
+				lines = f.read().splitlines()
+		finally:
+			os.remove(path)
+		self.assertEqual(len(stacks), len(lines))
+		self.assertEqual(sum(stacks.values()), sum(int(line.rsplit(" ", 1)[1]) for line in lines))
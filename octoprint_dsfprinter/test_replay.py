@@ -0,0 +1,62 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from octoprint_dsfprinter.capture_logger import CaptureLogger
+from octoprint_dsfprinter.gcode import Gcode
+from octoprint_dsfprinter.gcode_optimizer import GcodeOptimizer
+from octoprint_dsfprinter.replay import TracePrinter
+from octoprint_dsfprinter.session_recorder import SessionRecorder
+
+SESSION = [
+	("N1 M105*38\n", "ok T:21.3 /0.0"),
+	("N2 M105*37\n", "ok T:21.4 /0.0"),
+	("N3 G28*20\n", "ok"),
+	("N4 M115*36\n", "ok FIRMWARE_NAME: RepRapFirmware"),
+]
+
+
+class TestTracePrinter(TestCase):
+
+	def setUp(self) -> None:
+		super().setUp()
+		fd, self.path = tempfile.mkstemp(suffix=".dsftrace")
+		os.close(fd)
+		with CaptureLogger(SessionRecorder.logger):
+			recorder = SessionRecorder(self.path)
+			for line, response in SESSION:
+				recorder.record(SessionRecorder.WRITE, line)
+				recorder.record(SessionRecorder.READ, response)
+			recorder.close()
+		self.printer = TracePrinter(self.path, fast=True)
+		self.printer.subscribe()
+
+	def tearDown(self) -> None:
+		os.remove(self.path)
+		super().tearDown()
+
+	def test_command(self):
+		self.assertEqual([response for _, response in SESSION], [self.printer.command(line) for line, _ in SESSION])
+		self.assertEqual("ok", self.printer.command("M105\n"))
+
+	def test_command_optimized(self):
+		optimizer = GcodeOptimizer(interval=60.0)
+		with CaptureLogger(Gcode.logger):
+			responses = [optimizer.command(line, self.printer.command) for line, _ in SESSION]
+		self.assertEqual(1, optimizer.counters["elided"])
+		self.assertEqual(
+			["ok T:21.3 /0.0", "ok T:21.3 /0.0", "ok", "ok FIRMWARE_NAME: RepRapFirmware"], responses)
+
+	def test_command_latency(self):
+		with CaptureLogger(SessionRecorder.logger):
+			recorder = SessionRecorder(self.path)
+			recorder.record(SessionRecorder.WRITE, "G28\n")
+			time.sleep(0.2)
+			recorder.record(SessionRecorder.READ, "ok")
+			recorder.close()
+		printer = TracePrinter(self.path)
+		printer.subscribe()
+		before = time.monotonic()
+		self.assertEqual("ok", printer.command("G28\n"))
+		self.assertLessEqual(0.2, time.monotonic() - before)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from octoprint_dsfprinter.capture_logger import CaptureLogger
+from octoprint_dsfprinter.session_recorder import SessionRecorder, prune_traces, read_trace
+
+
+class TestSessionRecorder(TestCase):
+
+	def setUp(self) -> None:
+		super().setUp()
+		fd, self.path = tempfile.mkstemp(suffix=".dsftrace")
+		os.close(fd)
+
+	def tearDown(self) -> None:
+		os.remove(self.path)
+		super().tearDown()
+
+	def test_round_trip(self):
+		with CaptureLogger(SessionRecorder.logger):
+			recorder = SessionRecorder(self.path)
+			recorder.record(SessionRecorder.WRITE, "N1 M105*38\n")
+			recorder.record(SessionRecorder.READ, "ok T:21.3 /0.0")
+			recorder.record(SessionRecorder.INTERCEPT, "M291 P\"Ümlaut\"")
+			recorder.close()
+			recorder.record(SessionRecorder.WRITE, "M105\n")
+
+		records = list(read_trace(self.path))
+		self.assertEqual(
+			[(SessionRecorder.WRITE, "N1 M105*38\n"),
+				(SessionRecorder.READ, "ok T:21.3 /0.0"),
+				(SessionRecorder.INTERCEPT, "M291 P\"Ümlaut\"")],
+			[(kind, line) for _, kind, line in records])
+		timestamps = [timestamp for timestamp, _, _ in records]
+		self.assertEqual(sorted(timestamps), timestamps)
+
+	def test_truncated(self):
+		with CaptureLogger(SessionRecorder.logger):
+			recorder = SessionRecorder(self.path)
+			recorder.record(SessionRecorder.WRITE, "G28\n")
+			recorder.record(SessionRecorder.WRITE, "G1 X10\n")
+			recorder.close()
+		with open(self.path, "r+b") as f:
+			f.truncate(os.path.getsize(self.path) - 2)
+
+		self.assertEqual(["G28\n"], [line for _, _, line in read_trace(self.path)])
+
+	def test_not_a_trace(self):
+		with open(self.path, "wb") as f:
+			f.write(b"2020-10-19 18:16:41 >> M105")
+		with self.assertRaises(ValueError):
+			list(read_trace(self.path))
+
+	def test_prune(self):
+		with tempfile.TemporaryDirectory() as folder:
+			names = ["session-2020101{}-120000.dsftrace".format(day) for day in range(5)] + ["notes.txt"]
+			for mtime, name in enumerate(names):
+				path = os.path.join(folder, name)
+				open(path, "wb").close()
+				os.utime(path, (mtime, mtime))
+			with CaptureLogger(SessionRecorder.logger):
+				prune_traces(folder, 3)
+			self.assertEqual(sorted(names[2:]), sorted(os.listdir(folder)))
@@ -0,0 +1,62 @@
+import multiprocessing
+import queue
+from unittest import TestCase
+
+from octoprint_dsfprinter.shm_ring import LineRing
+
+
+def _echo(requests, responses, count):
+	for _ in range(count):
+		responses.put(requests.get(timeout=10).upper())
+
+
+class TestLineRing(TestCase):
+
+	def setUp(self) -> None:
+		super().setUp()
+		self.ring = LineRing(32)
+
+	def tearDown(self) -> None:
+		self.ring.close()
+		super().tearDown()
+
+	def test_put_get(self):
+		self.ring.put("M115\n")
+		self.ring.put("ok")
+		self.assertEqual("M115\n", self.ring.get(timeout=0))
+		self.assertEqual("ok", self.ring.get(timeout=0))
+
+	def test_wrap_around(self):
+		for i in range(20):
+			line = "G1 X{}".format(i)
+			self.ring.put(line, timeout=0)
+			self.assertEqual(line, self.ring.get(timeout=0))
+
+	def test_empty(self):
+		with self.assertRaises(queue.Empty):
+			self.ring.get(timeout=0)
+
+	def test_full(self):
+		self.ring.put("G1 X10 Y10 Z10 E1 F1200", timeout=0)
+		with self.assertRaises(queue.Full):
+			self.ring.put("M105", timeout=0)
+
+	def test_line_too_long(self):
+		with self.assertRaises(ValueError):
+			self.ring.put("; this comment does not fit into the ring")
+
+	def test_spawned_process(self):
+		ctx = multiprocessing.get_context("spawn")
+		requests = LineRing(64, ctx=ctx)
+		responses = LineRing(64, ctx=ctx)
+		process = ctx.Process(target=_echo, args=(requests, responses, 200))
+		process.start()
+		try:
+			for i in range(200):
+				requests.put("g1 x{}".format(i), timeout=10)
+				self.assertEqual("G1 X{}".format(i), responses.get(timeout=10))
+		finally:
+			process.join(10)
+			requests.close()
+			responses.close()
+		self.assertEqual(0, process.exitcode)